@@ -0,0 +1,80 @@
+"""
+SQLite connection helpers shared by the ETL, setup and monitoring scripts
+"""
+
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Connection tuning applied to every SQLite handle
+PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",  # 64 MiB
+    "PRAGMA mmap_size=30000000000",
+    "PRAGMA busy_timeout=10000",
+]
+
+def tune(conn):
+    """Apply WAL mode and performance PRAGMAs to a connection"""
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+class ConnPool:
+    """Optional writer connection plus a lazily opened pool of reader connections"""
+    
+    def __init__(self, path, n_readers=4, writer=True):
+        self.path = path
+        self.n_readers = n_readers
+        
+        # Writer first, so WAL is enabled before readers attach
+        self.writer = self._connect() if writer else None
+        
+        # Readers are opened on first demand, up to n_readers
+        self._readers = queue.Queue()
+        self._opened = 0
+        self._lock = threading.Lock()
+    
+    def _connect(self):
+        return tune(sqlite3.connect(self.path, check_same_thread=False))
+    
+    def _acquire(self):
+        """Take an idle reader, open a new one if below n_readers, else wait"""
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._lock:
+            can_open = self._opened < self.n_readers
+            if can_open:
+                self._opened += 1
+        
+        if not can_open:
+            return self._readers.get()
+        
+        try:
+            return self._connect()
+        except Exception:
+            with self._lock:
+                self._opened -= 1
+            raise
+    
+    @contextmanager
+    def read(self):
+        """Borrow a reader connection; under WAL it does not block on the writer"""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+    
+    def close(self):
+        """Close the writer and all idle reader connections"""
+        if self.writer is not None:
+            self.writer.close()
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
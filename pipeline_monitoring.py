@@ -7,42 +7,69 @@ import json
 from datetime import datetime
 import pandas as pd
 
-def check_database_health(db_path):
-    """Check database health"""
+from db import ConnPool
+
+# Count queries keyed by table list; reusing the same SQL text lets a
+# long-lived connection serve it from its prepared statement cache
+_count_queries = {}
+
+def table_row_counts(cursor):
+    """Count rows in every table with a single UNION ALL query"""
+    tables = tuple(
+        name for (name,) in cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+    )
+    
+    if not tables:
+        return []
+    
+    query = _count_queries.get(tables)
+    if query is None:
+        query = _count_queries[tables] = " UNION ALL ".join(
+            f"SELECT '{table}', COUNT(*) FROM \"{table}\"" for table in tables
+        )
+    cursor.execute(query)
+    return cursor.fetchall()
+
+def check_database_health(db_path, pool=None):
+    """Check database health using a reader connection from the pool"""
     print("🔍 Checking database health...")
     
+    owns_pool = pool is None
+    
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        if owns_pool:
+            pool = ConnPool(db_path, n_readers=1, writer=False)
         
-        # Get table info
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = [row[0] for row in cursor.fetchall()]
+        with pool.read() as conn:
+            cursor = conn.cursor()
+            
+            # Get table info and row counts in one round-trip
+            counts = table_row_counts(cursor)
+            
+            print(f"📊 Found {len(counts)} tables")
+            
+            # Check each table
+            for table, count in counts:
+                print(f"  • {table}: {count:,} rows")
+            
+            # Check data freshness
+            cursor.execute("SELECT MAX(transaction_date) FROM transactions")
+            latest_transaction = cursor.fetchone()[0]
+            
+            if latest_transaction:
+                print(f"📅 Latest transaction: {latest_transaction}")
         
-        print(f"📊 Found {len(tables)} tables")
-        
-        # Check each table
-        for table in tables:
-            cursor.execute(f"SELECT COUNT(*) FROM {table}")
-            count = cursor.fetchone()[0]
-            print(f"  • {table}: {count:,} rows")
-        
-        # Check data freshness
-        cursor.execute("SELECT MAX(transaction_date) FROM transactions")
-        latest_transaction = cursor.fetchone()[0]
-        
-        if latest_transaction:
-            print(f"📅 Latest transaction: {latest_transaction}")
-        
-        conn.close()
         print("✅ Database health check completed")
         
     except Exception as e:
         print(f"❌ Health check failed: {e}")
+    
+    finally:
+        if owns_pool and pool is not None:
+            pool.close()
 
 def backup_database(db_path, backup_dir="backups"):
     """Create a backup of the database"""
-    import shutil
     import os
     
     os.makedirs(backup_dir, exist_ok=True)
@@ -51,7 +78,15 @@ def backup_database(db_path, backup_dir="backups"):
     backup_path = f"{backup_dir}/fintech_backup_{timestamp}.db"
     
     try:
-        shutil.copy2(db_path, backup_path)
+        # Online backup API copies a consistent snapshot, even with WAL writers active.
+        # Read-only URI so a missing source raises instead of being created empty
+        src = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        dst = sqlite3.connect(backup_path)
+        try:
+            src.backup(dst, pages=1024, sleep=0)
+        finally:
+            dst.close()
+            src.close()
         print(f"✅ Database backed up to: {backup_path}")
         return True
     except Exception as e:
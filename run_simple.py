@@ -5,6 +5,30 @@ Simple runner for Windows
 import subprocess
 import sys
 import os
+import sqlite3
+
+from db import tune
+from pipeline_monitoring import table_row_counts
+
+DB_PATH = 'database/fintech_portfolio.db'
+
+# Tuned connection reused across menu iterations so its page cache stays warm
+_conn = None
+
+def _get_conn():
+    """Return the cached database connection, opening it on first use"""
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        tune(_conn)
+    return _conn
+
+def _close_conn():
+    """Close the cached database connection"""
+    global _conn
+    if _conn is not None:
+        _conn.close()
+        _conn = None
 
 def main():
     print("FinTech Data Engineering Project")
@@ -36,22 +60,17 @@ def main():
         
         elif choice == "4":
             print("\nChecking database...")
-            import sqlite3
             try:
-                conn = sqlite3.connect('database/fintech_portfolio.db')
-                cursor = conn.cursor()
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-                tables = cursor.fetchall()
-                print(f"Found {len(tables)} tables:")
-                for table in tables:
-                    cursor.execute(f"SELECT COUNT(*) FROM {table[0]}")
-                    count = cursor.fetchone()[0]
-                    print(f"  {table[0]}: {count:,} rows")
-                conn.close()
+                cursor = _get_conn().cursor()
+                counts = table_row_counts(cursor)
+                print(f"Found {len(counts)} tables:")
+                for table, count in counts:
+                    print(f"  {table}: {count:,} rows")
             except Exception as e:
                 print(f"Error: {e}")
         
         elif choice == "5":
+            _close_conn()
             print("\nGoodbye!")
             break
         
@@ -13,7 +13,7 @@ python -m pip install --upgrade pip setuptools wheel
 python -m pip cache purge
 
 echo Step 2: Installing minimal requirements...
-python -m pip install pandas numpy sqlite3 streamlit plotly
+python -m pip install pandas numpy pyarrow sqlite3 streamlit plotly
 
 echo Step 3: Creating project structure...
 mkdir data_sources 2>nul
@@ -3,13 +3,15 @@ Simple ETL Pipeline for Windows
 No emojis, no unicode issues
 """
 
-import sqlite3
 import pandas as pd
 import numpy as np
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import logging
 
+from db import ConnPool
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -21,19 +23,49 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Rows per chunk when streaming transactions from CSV into SQLite
+TRANSACTION_CHUNK_SIZE = 50000
+
+# Per-source read_csv options: repeated strings as categoricals, dates parsed on read
+READ_OPTIONS = {
+    'customers': {
+        'dtype': {'employment_status': 'category', 'residential_status': 'category', 'state': 'category'}
+    },
+    'loans': {
+        'dtype': {'loan_type': 'category', 'current_status': 'category'}
+    },
+    'transactions': {
+        'chunksize': TRANSACTION_CHUNK_SIZE,
+        'dtype': {'payment_mode': 'category', 'status': 'category'},
+        'parse_dates': ['transaction_date']
+    }
+}
+
+def _bin_codes(values, edges):
+    """
+    Category codes for right-closed bins between consecutive edges, as pd.cut
+    assigns them; missing or out-of-range values get -1 (NaN)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    codes = np.searchsorted(edges[1:-1], values)
+    codes[~((values > edges[0]) & (values <= edges[-1]))] = -1
+    return codes
+
 class SimpleETL:
     def __init__(self, config_file='config.json'):
         with open(config_file, 'r') as f:
             self.config = json.load(f)
         
         self.db_path = self.config['database']['path']
+        self.pool = None
         self.conn = None
         self.connect_db()
     
     def connect_db(self):
         """Connect to SQLite database"""
         try:
-            self.conn = sqlite3.connect(self.db_path)
+            self.pool = ConnPool(self.db_path)
+            self.conn = self.pool.writer
             logger.info(f"Connected to database: {self.db_path}")
         except Exception as e:
             logger.error(f"Database connection failed: {e}")
@@ -43,50 +75,60 @@ class SimpleETL:
         """Extract data from CSV files"""
         logger.info("Extracting data from CSV files...")
         
-        data = {}
+        sources = self.config['data_sources']
         
-        for key, file_path in self.config['data_sources'].items():
-            try:
-                df = pd.read_csv(file_path)
-                data[key] = df
-                logger.info(f"Loaded {len(df)} rows from {file_path}")
-            except Exception as e:
-                logger.error(f"Failed to load {file_path}: {e}")
-                data[key] = pd.DataFrame()
+        # read_csv releases the GIL while parsing, so files load in parallel
+        with ThreadPoolExecutor(max_workers=max(len(sources), 1)) as executor:
+            futures = {
+                key: executor.submit(self._read_source, key, file_path)
+                for key, file_path in sources.items()
+            }
+            data = {key: future.result() for key, future in futures.items()}
         
         return data
     
+    def _read_source(self, key, file_path):
+        """Read a single CSV source"""
+        try:
+            df = pd.read_csv(file_path, **READ_OPTIONS.get(key, {}))
+            if isinstance(df, pd.DataFrame):
+                logger.info(f"Loaded {len(df)} rows from {file_path}")
+            else:
+                logger.info(f"Streaming {file_path} in chunks of {df.chunksize} rows")
+            return df
+        except Exception as e:
+            logger.error(f"Failed to load {file_path}: {e}")
+            return pd.DataFrame()
+    
     def transform_data(self, data):
-        """Transform the data"""
+        """Transform the data (takes ownership of the extracted frames)"""
         logger.info("Transforming data...")
         
         transformed = {}
         
         # 1. Transform customers
         if 'customers' in data and not data['customers'].empty:
-            customers = data['customers'].copy()
+            customers = data.pop('customers')
             
-            # Create customer segments
-            conditions = [
-                customers['credit_score'] >= 750,
-                (customers['credit_score'] >= 700) & (customers['credit_score'] < 750),
-                (customers['credit_score'] >= 650) & (customers['credit_score'] < 700),
-                customers['credit_score'] < 650
-            ]
-            choices = ['Premium', 'Gold', 'Silver', 'Standard']
-            customers['customer_segment'] = np.select(conditions, choices, default='Standard')
+            # Create customer segments (thresholds are monotonic, so one binary search pass)
+            choices = np.array(['Standard', 'Silver', 'Gold', 'Premium'])
+            credit_score = customers['credit_score']
+            codes = np.searchsorted([650, 700, 750], credit_score.values, side='right')
+            # searchsorted sorts NaN last; a missing score meets no threshold, so it is 'Standard'
+            codes[credit_score.isna().values] = 0
+            customers['customer_segment'] = choices[codes]
             
             transformed['customers'] = customers
         
         # 2. Transform loans
         if 'loans' in data and not data['loans'].empty:
-            loans = data['loans'].copy()
+            loans = data.pop('loans')
             
             # Create risk bands
-            loans['risk_band'] = pd.cut(
-                loans['interest_rate'],
-                bins=[0, 10, 12, 14, 16, 100],
-                labels=['A', 'B', 'C', 'D', 'E']
+            loans['risk_band'] = pd.Categorical.from_codes(
+                _bin_codes(loans['interest_rate'].values, [0, 10, 12, 14, 16, 100]),
+                categories=['A', 'B', 'C', 'D', 'E'],
+                ordered=True
             )
             
             # Calculate total payable
@@ -95,16 +137,12 @@ class SimpleETL:
             
             transformed['loans'] = loans
         
-        # 3. Transform transactions
-        if 'transactions' in data and not data['transactions'].empty:
-            transactions = data['transactions'].copy()
-            
-            # Parse date
-            if 'transaction_date' in transactions.columns:
-                transactions['transaction_date'] = pd.to_datetime(transactions['transaction_date'])
-                transactions['transaction_month'] = transactions['transaction_date'].dt.strftime('%Y-%m')
-            
-            transformed['transactions'] = transactions
+        # 3. Transform transactions (lazily, chunk by chunk)
+        if 'transactions' in data:
+            chunks = data.pop('transactions')
+            if isinstance(chunks, pd.DataFrame):
+                chunks = [chunks]
+            transformed['transactions'] = (self.transform_transactions(chunk) for chunk in chunks)
         
         # 4. Create risk features
         if 'loans' in transformed and 'customers' in transformed:
@@ -114,59 +152,114 @@ class SimpleETL:
         logger.info("Data transformation completed")
         return transformed
     
+    def transform_transactions(self, transactions):
+        """Transform one chunk of transactions"""
+        # transaction_date is already parsed by read_csv
+        if 'transaction_date' in transactions.columns:
+            transactions['transaction_month'] = transactions['transaction_date'].dt.strftime('%Y-%m')
+        
+        return transactions
+    
     def create_risk_features(self, loans, customers):
         """Create risk features"""
-        # Merge data
-        merged = pd.merge(loans, customers, on='customer_id', how='left')
-        
         risk_features = pd.DataFrame()
-        risk_features['loan_id'] = merged['loan_id']
+        risk_features['loan_id'] = loans['loan_id']
         
-        # Calculate risk score (simplified)
-        if 'credit_score' in merged.columns:
-            risk_score = merged['credit_score'] * 0.1 + 20  # Simplified formula
+        # Calculate risk score (simplified) into a single preallocated buffer
+        risk_score = np.empty(len(loans), dtype=np.float64)
+        if 'credit_score' in customers.columns:
+            # Look up each loan's credit score by customer_id instead of a full merge
+            credit_score = customers.set_index('customer_id')['credit_score'].reindex(loans['customer_id']).values
+            np.multiply(credit_score, 0.1, out=risk_score)  # Simplified formula
+            risk_score += 20
         else:
-            risk_score = np.random.uniform(50, 90, len(merged))
+            risk_score[:] = np.random.uniform(50, 90, len(loans))
         
-        risk_features['risk_score'] = np.clip(risk_score, 0, 100).round(2)
+        np.clip(risk_score, 0, 100, out=risk_score)
+        np.round(risk_score, 2, out=risk_score)
+        risk_features['risk_score'] = risk_score
         
         # Create risk grade
-        risk_features['risk_grade'] = pd.cut(
-            risk_features['risk_score'],
-            bins=[0, 60, 70, 80, 90, 100],
-            labels=['E', 'D', 'C', 'B', 'A']
+        risk_features['risk_grade'] = pd.Categorical.from_codes(
+            _bin_codes(risk_features['risk_score'].values, [0, 60, 70, 80, 90, 100]),
+            categories=['E', 'D', 'C', 'B', 'A'],
+            ordered=True
         )
         
         return risk_features
     
     def load_data(self, data):
-        """Load data to database"""
+        """Load data to database and return per-table load statistics"""
         logger.info("Loading data to database...")
         
+        cursor = self.conn.cursor()
+        summary = {}
+        
         try:
-            # Load each dataframe
-            for table_name, df in data.items():
-                if not df.empty:
-                    # Use to_sql to create/append table
-                    df.to_sql(table_name, self.conn, if_exists='replace', index=False)
-                    logger.info(f"Loaded {len(df)} rows to {table_name}")
+            # Single write transaction for the whole load
+            cursor.execute("BEGIN IMMEDIATE")
+            
+            # Load each dataframe, or each chunk of a streamed source
+            for table_name, frames in data.items():
+                if isinstance(frames, pd.DataFrame):
+                    frames = [frames]
+                
+                stats = None
+                for df in frames:
+                    if df.empty:
+                        continue
+                    
+                    if stats is None:
+                        # Replace table contents; columns follow the simple_setup.py schema
+                        cursor.execute(f"DELETE FROM {table_name}")
+                        stats = summary[table_name] = {
+                            'row_count': 0,
+                            'column_count': len(df.columns),
+                            'memory_usage_mb': 0.0
+                        }
+                    
+                    columns = ', '.join(df.columns)
+                    placeholders = ', '.join('?' * len(df.columns))
+                    cursor.executemany(
+                        f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})",
+                        self._to_records(df)
+                    )
+                    stats['row_count'] += len(df)
+                    # Shallow size: exact for numeric and categorical columns, cheap for object ones
+                    stats['memory_usage_mb'] += df.memory_usage(deep=False).sum() / 1024 / 1024
+                
+                if stats:
+                    logger.info(f"Loaded {stats['row_count']} rows to {table_name}")
             
             # Create portfolio summary
             self.create_portfolio_summary()
             
             self.conn.commit()
             logger.info("Data loading completed successfully")
+            return summary
             
         except Exception as e:
             logger.error(f"Data loading failed: {e}")
             self.conn.rollback()
             raise
     
+    @staticmethod
+    def _to_records(df):
+        """Convert a DataFrame into parameter tuples for executemany"""
+        datetime_cols = df.select_dtypes(include=['datetime']).columns
+        if len(datetime_cols):
+            df = df.assign(**{
+                col: df[col].dt.strftime('%Y-%m-%d %H:%M:%S') for col in datetime_cols
+            })
+        return list(df.itertuples(index=False, name=None))
+    
     def create_portfolio_summary(self):
         """Create portfolio summary"""
         try:
-            # Get portfolio metrics
+            # Aggregate and insert in one statement, inside the load transaction
             query = """
+            INSERT INTO portfolio_summary 
+            (calculation_date, total_loans, total_disbursed, active_loans, avg_interest_rate)
             SELECT 
                 date('now') as calculation_date,
                 COUNT(*) as total_loans,
@@ -176,18 +269,8 @@ class SimpleETL:
             FROM loans
             """
             
-            cursor = self.conn.cursor()
-            cursor.execute(query)
-            result = cursor.fetchone()
-            
-            if result:
-                insert_query = """
-                INSERT INTO portfolio_summary 
-                (calculation_date, total_loans, total_disbursed, active_loans, avg_interest_rate)
-                VALUES (?, ?, ?, ?, ?)
-                """
-                cursor.execute(insert_query, result)
-                logger.info("Portfolio summary created")
+            self.conn.execute(query)
+            logger.info("Portfolio summary created")
         
         except Exception as e:
             logger.error(f"Failed to create portfolio summary: {e}")
@@ -205,10 +288,10 @@ class SimpleETL:
             transformed_data = self.transform_data(raw_data)
             
             # Load
-            self.load_data(transformed_data)
+            summary = self.load_data(transformed_data)
             
             # Generate report
-            self.generate_report(transformed_data)
+            self.generate_report(summary)
             
             end_time = datetime.now()
             duration = end_time - start_time
@@ -219,8 +302,8 @@ class SimpleETL:
             print(f"{'='*60}")
             print(f"Duration: {duration}")
             print("\nData Summary:")
-            for name, df in transformed_data.items():
-                print(f"  {name}: {len(df):,} rows")
+            for name, stats in summary.items():
+                print(f"  {name}: {stats['row_count']:,} rows")
             print(f"{'='*60}")
             
             return True
@@ -230,18 +313,18 @@ class SimpleETL:
             print(f"\nETL pipeline failed: {e}")
             return False
     
-    def generate_report(self, data):
-        """Generate data quality report"""
+    def generate_report(self, summary):
+        """Generate data quality report from load statistics"""
         report = {
             'timestamp': datetime.now().isoformat(),
             'summary': {}
         }
         
-        for name, df in data.items():
+        for name, stats in summary.items():
             report['summary'][name] = {
-                'row_count': len(df),
-                'column_count': len(df.columns),
-                'memory_usage_mb': round(df.memory_usage(deep=True).sum() / 1024 / 1024, 2)
+                'row_count': stats['row_count'],
+                'column_count': stats['column_count'],
+                'memory_usage_mb': round(stats['memory_usage_mb'], 2)
             }
         
         with open('etl_report.json', 'w') as f:
@@ -257,5 +340,5 @@ if __name__ == "__main__":
     etl = SimpleETL()
     success = etl.run_pipeline()
     
-    if etl.conn:
-        etl.conn.close()
\ No newline at end of file
+    if etl.pool:
+        etl.pool.close()
\ No newline at end of file
@@ -9,6 +9,10 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import json
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+from db import tune
 
 print("=" * 60)
 print("FinTech Project - Simple Setup")
@@ -24,6 +28,7 @@ print("\n1. Setting up SQLite database...")
 db_path = "database/fintech_portfolio.db"
 
 conn = sqlite3.connect(db_path)
+tune(conn)  # WAL is persistent, so this also converts the file itself
 cursor = conn.cursor()
 
 # Create tables
@@ -39,6 +44,7 @@ tables_sql = [
         residential_status TEXT,
         age INTEGER,
         state TEXT,
+        customer_segment TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
     """,
@@ -55,6 +61,9 @@ tables_sql = [
         loan_type TEXT,
         emi_amount REAL,
         current_status TEXT,
+        risk_band TEXT,
+        total_payable REAL,
+        total_interest REAL,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         FOREIGN KEY (customer_id) REFERENCES customers(customer_id)
     )
@@ -70,6 +79,7 @@ tables_sql = [
         payment_mode TEXT,
         status TEXT,
         bounce_flag INTEGER DEFAULT 0,
+        transaction_month TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         FOREIGN KEY (loan_id) REFERENCES loans(loan_id)
     )
@@ -100,12 +110,23 @@ tables_sql = [
     """
 ]
 
-for i, sql in enumerate(tables_sql):
-    try:
-        cursor.execute(sql)
-        print(f"  Table {i+1} created successfully")
-    except Exception as e:
-        print(f"  Error creating table {i+1}: {e}")
+# Create indexes (SQLite does not index FOREIGN KEY columns on its own).
+# The foreign key indexes lead with the key and also cover the analytics
+# queries, matching sqlite_queries.ANALYTICS_INDEXES
+indexes_sql = [
+    "CREATE INDEX IF NOT EXISTS idx_loans_customer_date ON loans(customer_id, disbursement_date)",
+    "CREATE INDEX IF NOT EXISTS idx_txn_loan_date_covering ON transactions(loan_id, transaction_date, status, bounce_flag, amount)",
+    "CREATE INDEX IF NOT EXISTS idx_txn_date ON transactions(transaction_date)"
+]
+
+# Submit all DDL as one script
+schema_script = ";\n".join(sql.strip().rstrip(';') for sql in tables_sql + indexes_sql) + ';'
+
+try:
+    cursor.executescript(schema_script)
+    print(f"  {len(tables_sql)} tables and {len(indexes_sql)} indexes created successfully")
+except Exception as e:
+    print(f"  Error creating schema: {e}")
 
 conn.commit()
 conn.close()
@@ -121,50 +142,63 @@ have_own_data = all(os.path.exists(f"data_sources/{file}") for file in csv_files
 if not have_own_data:
     print("Generating sample data...")
     
+    # Category lookups: sample integer indices, then gather in one step
+    employment_statuses = np.array(['Employed', 'Self-Employed', 'Unemployed'])
+    residential_statuses = np.array(['Owned', 'Rented'])
+    states = np.array(['Maharashtra', 'Karnataka', 'Delhi', 'Tamil Nadu', 'Gujarat'])
+    loan_types = np.array(['Personal', 'Business', 'Home', 'Auto', 'Education'])
+    loan_statuses = np.array(['ACTIVE', 'CLOSED', 'DELINQUENT'])
+    payment_modes = np.array(['UPI', 'Net Banking', 'Debit Card', 'NEFT'])
+    transaction_statuses = np.array(['SUCCESS', 'FAILED'])
+    
     # Create sample customers
     np.random.seed(42)
     n_customers = 1000
     customers = pd.DataFrame({
         'customer_id': [f'CUST{i:06d}' for i in range(1, n_customers+1)],
-        'joining_date': pd.date_range('2022-01-01', periods=n_customers).strftime('%Y-%m-%d'),
+        'joining_date': (np.datetime64('2022-01-01') + np.arange(n_customers)).astype(str),
         'credit_score': np.random.randint(300, 900, n_customers),
         'annual_income': np.random.uniform(300000, 5000000, n_customers),
-        'employment_status': np.random.choice(['Employed', 'Self-Employed', 'Unemployed'], n_customers),
-        'residential_status': np.random.choice(['Owned', 'Rented'], n_customers),
+        'employment_status': employment_statuses[np.random.randint(0, len(employment_statuses), n_customers)],
+        'residential_status': residential_statuses[np.random.randint(0, len(residential_statuses), n_customers)],
         'age': np.random.randint(22, 70, n_customers),
-        'state': np.random.choice(['Maharashtra', 'Karnataka', 'Delhi', 'Tamil Nadu', 'Gujarat'], n_customers)
+        'state': states[np.random.randint(0, len(states), n_customers)]
     })
     
     # Create sample loans
     n_loans = 5000
     loans = pd.DataFrame({
         'loan_id': [f'LN{i:06d}' for i in range(1, n_loans+1)],
-        'customer_id': np.random.choice(customers['customer_id'], n_loans),
-        'disbursement_date': pd.date_range('2023-01-01', periods=n_loans).strftime('%Y-%m-%d'),
+        'customer_id': customers['customer_id'].values[np.random.randint(0, n_customers, n_loans)],
+        'disbursement_date': (np.datetime64('2023-01-01') + np.arange(n_loans)).astype(str),
         'loan_amount': np.random.choice([50000, 100000, 200000, 500000], n_loans),
         'interest_rate': np.random.uniform(8.0, 18.0, n_loans),
         'tenure_months': np.random.choice([12, 24, 36, 48], n_loans),
-        'loan_type': np.random.choice(['Personal', 'Business', 'Home', 'Auto', 'Education'], n_loans),
+        'loan_type': loan_types[np.random.randint(0, len(loan_types), n_loans)],
         'emi_amount': np.random.uniform(5000, 50000, n_loans),
-        'current_status': np.random.choice(['ACTIVE', 'CLOSED', 'DELINQUENT'], n_loans, p=[0.7, 0.25, 0.05])
+        'current_status': loan_statuses[np.searchsorted([0.7, 0.95], np.random.rand(n_loans), side='right')]
     })
     
     # Create sample transactions
     n_transactions = 20000
     transactions = pd.DataFrame({
         'transaction_id': [f'TXN{i:06d}' for i in range(1, n_transactions+1)],
-        'loan_id': np.random.choice(loans['loan_id'], n_transactions),
-        'transaction_date': pd.date_range('2023-01-01', periods=n_transactions).strftime('%Y-%m-%d %H:%M:%S'),
+        'loan_id': loans['loan_id'].values[np.random.randint(0, n_loans, n_transactions)],
+        'transaction_date': np.char.add((np.datetime64('2023-01-01') + np.arange(n_transactions)).astype(str), ' 00:00:00'),
         'amount': np.random.uniform(1000, 50000, n_transactions),
-        'payment_mode': np.random.choice(['UPI', 'Net Banking', 'Debit Card', 'NEFT'], n_transactions),
-        'status': np.random.choice(['SUCCESS', 'FAILED'], n_transactions, p=[0.9, 0.1]),
-        'bounce_flag': np.random.choice([0, 1], n_transactions, p=[0.95, 0.05])
+        'payment_mode': payment_modes[np.random.randint(0, len(payment_modes), n_transactions)],
+        'status': transaction_statuses[(np.random.rand(n_transactions) >= 0.9).astype(int)],
+        'bounce_flag': (np.random.rand(n_transactions) < 0.05).astype(int)
     })
     
-    # Save to CSV
-    customers.to_csv('data_sources/customers.csv', index=False)
-    loans.to_csv('data_sources/loans.csv', index=False)
-    transactions.to_csv('data_sources/transactions.csv', index=False)
+    # Save to CSV (PyArrow's native multi-threaded writer)
+    write_options = pacsv.WriteOptions(include_header=True)
+    for name, df in [('customers', customers), ('loans', loans), ('transactions', transactions)]:
+        pacsv.write_csv(
+            pa.Table.from_pandas(df, preserve_index=False),
+            f'data_sources/{name}.csv',
+            write_options=write_options
+        )
     
     print(f"Created sample data: {n_customers} customers, {n_loans} loans, {n_transactions} transactions")
 else:
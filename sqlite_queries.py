@@ -3,14 +3,186 @@ SQLite-Compatible Advanced Queries
 These will work with your SQLite database
 """
 
+import functools
+import hashlib
+import json
+import math
+import os
 import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from db import tune
+
+DB_PATH = 'database/fintech_portfolio.db'
+ANALYTICS_DIR = 'analytics'
+
+# Read-heavy analytics tuning, applied once when a connection is opened
+ANALYTICS_PRAGMAS = """
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=OFF;
+PRAGMA temp_store=MEMORY;
+PRAGMA mmap_size=268435456;
+PRAGMA cache_size=-524288;
+"""
+
+# Default memory map size; raised to cover larger database files
+MMAP_SIZE = 268435456
+
+# Result cache database, kept next to the main file and attached as "cache".
+# The main file runs with synchronous=OFF for reads; cache writes stay durable
+# and never touch the production database.
+CACHE_DB_NAME = 'analytics_cache.db'
+CACHE_PRAGMAS = """
+PRAGMA cache.journal_mode=WAL;
+PRAGMA cache.synchronous=NORMAL;
+"""
 
-def get_connection(db_path='database/fintech_portfolio.db'):
-    """Get SQLite connection"""
-    conn = sqlite3.connect(db_path)
+# Per-thread open connections keyed by database path
+_local = threading.local()
+
+# Analytics worker pool kept for the life of the process, so its threads'
+# connections (with their page and statement caches) stay warm across runs
+ANALYTICS_WORKERS = min(8, os.cpu_count() or 1)
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    """Get the shared analytics worker pool, creating it on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=ANALYTICS_WORKERS, thread_name_prefix='analytics'
+            )
+    return _executor
+
+def get_connection(db_path=DB_PATH):
+    """Get this thread's cached, tuned SQLite connection for db_path"""
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = connections[db_path] = sqlite3.connect(
+            db_path, check_same_thread=False, cached_statements=256
+        )
+        conn.executescript(ANALYTICS_PRAGMAS)
+        
+        conn.execute(
+            "ATTACH DATABASE ? AS cache",
+            (os.path.join(os.path.dirname(db_path), CACHE_DB_NAME),)
+        )
+        conn.executescript(CACHE_PRAGMAS)
+        
+        # Map the whole file (with room to grow) so page reads are plain memory reads
+        db_size = os.path.getsize(db_path) if os.path.exists(db_path) else 0
+        if db_size * 2 > MMAP_SIZE:
+            conn.execute(f"PRAGMA mmap_size={db_size * 2}")
     return conn
 
+# SQLite functions the analytics SQL uses, defined for DuckDB.
+# DuckDB's julian() counts from midnight, SQLite's JULIANDAY from noon.
+DUCKDB_MACROS = """
+CREATE OR REPLACE MACRO JULIANDAY(x) AS julian(CAST(x AS TIMESTAMP)) - 0.5;
+"""
+
+def get_duckdb_connection(db_path=DB_PATH):
+    """
+    Get this thread's DuckDB connection with the SQLite file attached read-only.
+    Needs the optional duckdb package; used by run_all_analytics(engine='duckdb').
+    """
+    connections = getattr(_local, 'duckdb_connections', None)
+    if connections is None:
+        connections = _local.duckdb_connections = {}
+    
+    con = connections.get(db_path)
+    if con is None:
+        import duckdb
+        
+        con = duckdb.connect(':memory:')
+        con.execute("INSTALL sqlite; LOAD sqlite;")
+        con.execute(f"ATTACH '{db_path}' AS fintech (TYPE sqlite, READ_ONLY)")
+        con.execute("USE fintech")
+        # Same integer '/' semantics as SQLite (used by the quarter arithmetic)
+        con.execute("SET integer_division = true")
+        con.execute(DUCKDB_MACROS)
+        connections[db_path] = con
+    return con
+
+# Covering indexes for the analytics predicates, join keys and window orderings
+ANALYTICS_INDEXES = {
+    'idx_loans_customer_date': ('loans', ('customer_id', 'disbursement_date')),
+    'idx_loans_status_band': ('loans', ('current_status', 'risk_band')),
+    'idx_txn_loan_date_covering': ('transactions', ('loan_id', 'transaction_date', 'status', 'bounce_flag', 'amount')),
+    'idx_risk_features_loan': ('risk_features', ('loan_id',)),
+    'idx_customers_joining': ('customers', ('customer_id', 'joining_date'))
+}
+
+def index_columns(conn):
+    """
+    Map every full (non-partial) index name to (table, columns, plain), where
+    plain marks a non-unique CREATE INDEX that is safe to drop
+    """
+    indexes = {}
+    for (table,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table'"):
+        for _, name, unique, origin, partial in conn.execute(f'PRAGMA index_list("{table}")'):
+            if partial:
+                continue
+            columns = tuple(row[2] for row in conn.execute(f'PRAGMA index_info("{name}")'))
+            indexes[name] = (table, columns, origin == 'c' and not unique)
+    return indexes
+
+def ensure_indexes(db_path=DB_PATH):
+    """
+    Create any missing analytics indexes and refresh planner statistics.
+    An index is skipped when an existing one (e.g. a PRIMARY KEY) already leads
+    with its columns, and plain indexes made redundant by a wider or unique
+    index are dropped so loads do not maintain both.
+    This writes to the main file, so it runs on a db.tune() connection
+    (synchronous=NORMAL) rather than the synchronous=OFF analytics ones.
+    """
+    conn = tune(sqlite3.connect(db_path))
+    try:
+        existing = index_columns(conn)
+        changed = False
+        
+        for name, (table, columns) in ANALYTICS_INDEXES.items():
+            if any(t == table and cols[:len(columns)] == columns for t, cols, _ in existing.values()):
+                continue
+            try:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({', '.join(columns)})")
+                existing[name] = (table, columns, True)
+                changed = True
+            except sqlite3.Error as e:
+                print(f"Index {name} skipped: {e}")
+        
+        for name, (table, columns, plain) in list(existing.items()):
+            # Redundant if a wider index, or a unique/PRIMARY KEY one, leads with its columns
+            superseded = plain and any(
+                t == table and cols[:len(columns)] == columns
+                and (len(cols) > len(columns) or not other_plain)
+                for other, (t, cols, other_plain) in existing.items() if other != name
+            )
+            if superseded:
+                conn.execute(f"DROP INDEX IF EXISTS {name}")
+                del existing[name]
+                changed = True
+        
+        if changed:
+            conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+
 # ==================== ADVANCED ANALYTICAL QUERIES ====================
 
 def cohort_analysis_sqlite():
@@ -20,42 +192,53 @@ def cohort_analysis_sqlite():
     """
     query = """
     WITH customer_cohorts AS (
+        -- Cohort comes from the customer alone; loans are joined once below.
+        -- Quarters are sliced from the ISO date text, skipping strftime parsing
         SELECT 
-            c.customer_id,
-            strftime('%Y', c.joining_date) || '-Q' || 
-            ((strftime('%m', c.joining_date) + 2) / 3) as cohort_quarter,
-            MIN(l.disbursement_date) as first_loan_date
-        FROM customers c
-        JOIN loans l ON c.customer_id = l.customer_id
-        GROUP BY c.customer_id, cohort_quarter
+            customer_id,
+            substr(joining_date, 1, 4) || '-Q' || 
+            ((CAST(substr(joining_date, 6, 2) AS INTEGER) + 2) / 3) as cohort_quarter
+        FROM customers
     ),
     loan_activity AS (
         SELECT 
             cc.customer_id,
             cc.cohort_quarter,
-            strftime('%Y', l.disbursement_date) || '-Q' || 
-            ((strftime('%m', l.disbursement_date) + 2) / 3) as loan_quarter,
-            COUNT(DISTINCT l.loan_id) as loans_taken
+            substr(l.disbursement_date, 1, 4) || '-Q' || 
+            ((CAST(substr(l.disbursement_date, 6, 2) AS INTEGER) + 2) / 3) as loan_quarter,
+            COUNT(*) as loans_taken
         FROM customer_cohorts cc
         JOIN loans l ON cc.customer_id = l.customer_id
         GROUP BY cc.customer_id, cc.cohort_quarter, loan_quarter
+    ),
+    first_quarters AS (
+        SELECT 
+            cohort_quarter,
+            MIN(loan_quarter) as first_loan_quarter
+        FROM loan_activity
+        GROUP BY cohort_quarter
+    ),
+    cohort_size AS (
+        -- Active customers in each cohort's first loan quarter (retention base)
+        SELECT 
+            la.cohort_quarter,
+            COUNT(DISTINCT la.customer_id) as base
+        FROM loan_activity la
+        JOIN first_quarters fq 
+            ON la.cohort_quarter = fq.cohort_quarter 
+            AND la.loan_quarter = fq.first_loan_quarter
+        GROUP BY la.cohort_quarter
     )
     SELECT 
-        cohort_quarter,
-        loan_quarter,
-        COUNT(DISTINCT customer_id) as active_customers,
-        SUM(loans_taken) as total_loans,
-        ROUND(
-            COUNT(DISTINCT customer_id) * 100.0 / 
-            FIRST_VALUE(COUNT(DISTINCT customer_id)) OVER (
-                PARTITION BY cohort_quarter 
-                ORDER BY loan_quarter
-            ), 
-            2
-        ) as retention_rate
-    FROM loan_activity
-    GROUP BY cohort_quarter, loan_quarter
-    ORDER BY cohort_quarter, loan_quarter;
+        la.cohort_quarter,
+        la.loan_quarter,
+        COUNT(DISTINCT la.customer_id) as active_customers,
+        SUM(la.loans_taken) as total_loans,
+        COUNT(DISTINCT la.customer_id) * 100.0 / cs.base as retention_rate
+    FROM loan_activity la
+    JOIN cohort_size cs ON la.cohort_quarter = cs.cohort_quarter
+    GROUP BY la.cohort_quarter, la.loan_quarter, cs.base
+    ORDER BY la.cohort_quarter, la.loan_quarter;
     """
     
     return query
@@ -76,16 +259,13 @@ def risk_adjusted_return_sqlite():
             THEN l.loan_amount - COALESCE(l.total_paid, 0) 
             ELSE 0 
         END) as expected_loss,
-        ROUND(
-            (SUM(l.total_interest) - 
-             SUM(CASE 
-                 WHEN l.current_status = 'DEFAULT' 
-                 THEN l.loan_amount - COALESCE(l.total_paid, 0) 
-                 ELSE 0 
-             END)) * 100.0 / 
-            SUM(l.loan_amount), 
-            2
-        ) as raroc_percentage
+        (SUM(l.total_interest) - 
+         SUM(CASE 
+             WHEN l.current_status = 'DEFAULT' 
+             THEN l.loan_amount - COALESCE(l.total_paid, 0) 
+             ELSE 0 
+         END)) * 100.0 / 
+        SUM(l.loan_amount) as raroc_percentage
     FROM loans l
     WHERE l.risk_band IS NOT NULL
     GROUP BY l.risk_band
@@ -109,33 +289,32 @@ def payment_behavior_analysis_sqlite():
         t.bounce_flag,
         AVG(t.amount) OVER (
             PARTITION BY t.customer_id 
-            ORDER BY t.transaction_date 
+            ORDER BY t.transaction_date, t.transaction_id 
             ROWS BETWEEN 3 PRECEDING AND CURRENT ROW
         ) as moving_avg_payment,
-        SUM(CASE WHEN t.status = 'SUCCESS' THEN 1 ELSE 0 END) OVER (
-            PARTITION BY t.customer_id 
-            ORDER BY t.transaction_date
-        ) as cumulative_success_count,
-        ROUND(
-            SUM(CASE WHEN t.bounce_flag = 1 THEN 1 ELSE 0 END) OVER (
-                PARTITION BY t.customer_id 
-                ORDER BY t.transaction_date
-            ) * 100.0 /
-            COUNT(*) OVER (
-                PARTITION BY t.customer_id 
-                ORDER BY t.transaction_date
-            ), 
-            2
-        ) as cumulative_bounce_rate
+        SUM(CASE WHEN t.status = 'SUCCESS' THEN 1 ELSE 0 END) OVER running as cumulative_success_count,
+        SUM(CASE WHEN t.bounce_flag = 1 THEN 1 ELSE 0 END) OVER running * 100.0 /
+        ROW_NUMBER() OVER running as cumulative_bounce_rate
     FROM (
+        -- Limit before windowing; ordered on a unique key and with frames that
+        -- only look back in that order, the first 1000 rows get the same values
+        -- as over the full table
         SELECT 
             l.customer_id,
             t.*
         FROM transactions t
         JOIN loans l ON t.loan_id = l.loan_id
+        ORDER BY l.customer_id, t.transaction_date, t.transaction_id
+        LIMIT 1000  -- Limit results for demo
     ) t
-    ORDER BY t.customer_id, t.transaction_date
-    LIMIT 1000;  -- Limit results for demo
+    -- One running window shared by the cumulative columns; ROW_NUMBER is its row count.
+    -- transaction_id breaks same-day ties so each row's running values are deterministic
+    WINDOW running AS (
+        PARTITION BY t.customer_id 
+        ORDER BY t.transaction_date, t.transaction_id
+        ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+    )
+    ORDER BY t.customer_id, t.transaction_date, t.transaction_id;
     """
     
     return query
@@ -146,7 +325,14 @@ def early_warning_system_sqlite():
     SQLite compatible version
     """
     query = """
-    WITH loan_metrics AS (
+    WITH stages(lo, hi, label, stage_order) AS (
+        -- Days-past-due ranges per stage; anything unmatched is 'Current'
+        VALUES 
+            (31, 999999, 'Stage 3 - High Risk', 1),
+            (15, 30, 'Stage 2 - Medium Risk', 2),
+            (1, 14, 'Stage 1 - Low Risk', 3)
+    ),
+    loan_metrics AS (
         SELECT 
             l.loan_id,
             l.customer_id,
@@ -154,19 +340,16 @@ def early_warning_system_sqlite():
             l.paid_percentage,
             l.bounce_rate,
             l.is_delinquent,
-            rf.combined_risk_score,
-            CASE 
-                WHEN l.dpd > 30 THEN 'Stage 3 - High Risk'
-                WHEN l.dpd BETWEEN 15 AND 30 THEN 'Stage 2 - Medium Risk'
-                WHEN l.dpd BETWEEN 1 AND 15 THEN 'Stage 1 - Low Risk'
-                ELSE 'Current'
-            END as risk_stage,
+            -- Indexed point lookup per loan instead of widening every row with a join
+            (SELECT rf.combined_risk_score FROM risk_features rf WHERE rf.loan_id = l.loan_id) as combined_risk_score,
+            COALESCE(s.label, 'Current') as risk_stage,
+            COALESCE(s.stage_order, 4) as stage_order,
             CASE 
                 WHEN l.paid_percentage < (l.days_since_disbursement * 100.0 / (l.tenure_months * 30)) * 0.8 
                 THEN 1 ELSE 0 
             END as behind_schedule
         FROM loans l
-        LEFT JOIN risk_features rf ON l.loan_id = rf.loan_id
+        LEFT JOIN stages s ON l.dpd BETWEEN s.lo AND s.hi
         WHERE l.current_status = 'ACTIVE'
     )
     SELECT 
@@ -174,17 +357,11 @@ def early_warning_system_sqlite():
         COUNT(*) as loan_count,
         SUM(CASE WHEN is_delinquent = 1 THEN 1 ELSE 0 END) as already_delinquent,
         SUM(CASE WHEN behind_schedule = 1 THEN 1 ELSE 0 END) as behind_schedule_count,
-        ROUND(AVG(combined_risk_score), 2) as avg_risk_score,
-        ROUND(AVG(bounce_rate), 2) as avg_bounce_rate
+        AVG(combined_risk_score) as avg_risk_score,
+        AVG(bounce_rate) as avg_bounce_rate
     FROM loan_metrics
-    GROUP BY risk_stage
-    ORDER BY 
-        CASE risk_stage
-            WHEN 'Stage 3 - High Risk' THEN 1
-            WHEN 'Stage 2 - Medium Risk' THEN 2
-            WHEN 'Stage 1 - Low Risk' THEN 3
-            ELSE 4
-        END;
+    GROUP BY risk_stage, stage_order
+    ORDER BY stage_order;
     """
     
     return query
@@ -200,11 +377,12 @@ def customer_rfm_analysis_sqlite():
             c.customer_id,
             -- Recency: Days since last transaction
             COALESCE(
-                JULIANDAY('now') - JULIANDAY(MAX(t.transaction_date)), 
+                $today - JULIANDAY(MAX(t.transaction_date)), 
                 365
             ) as recency,
-            -- Frequency: Number of successful transactions
-            COALESCE(COUNT(DISTINCT t.transaction_id), 0) as frequency,
+            -- Frequency: Number of successful transactions (transaction_id is unique,
+            -- so counting non-NULL ids needs no DISTINCT hash)
+            COALESCE(COUNT(t.transaction_id), 0) as frequency,
             -- Monetary: Total amount paid
             COALESCE(SUM(t.amount), 0) as monetary,
             -- Risk: Average risk score
@@ -215,18 +393,39 @@ def customer_rfm_analysis_sqlite():
         LEFT JOIN risk_features rf ON l.loan_id = rf.loan_id
         GROUP BY c.customer_id
     ),
+    -- One single-ordering NTILE per CTE, joined back on customer_id
+    r_scores AS (
+        SELECT customer_id, NTILE(4) OVER (ORDER BY recency DESC, customer_id) as r_score
+        FROM customer_rfm
+    ),
+    f_scores AS (
+        SELECT customer_id, NTILE(4) OVER (ORDER BY frequency, customer_id) as f_score
+        FROM customer_rfm
+    ),
+    m_scores AS (
+        SELECT customer_id, NTILE(4) OVER (ORDER BY monetary, customer_id) as m_score
+        FROM customer_rfm
+    ),
+    risk_scores AS (
+        SELECT customer_id, NTILE(4) OVER (ORDER BY avg_risk_score DESC, customer_id) as risk_score
+        FROM customer_rfm
+    ),
     rfm_scores AS (
         SELECT 
-            customer_id,
-            recency,
-            frequency,
-            monetary,
-            avg_risk_score,
-            NTILE(4) OVER (ORDER BY recency DESC) as r_score,
-            NTILE(4) OVER (ORDER BY frequency) as f_score,
-            NTILE(4) OVER (ORDER BY monetary) as m_score,
-            NTILE(4) OVER (ORDER BY avg_risk_score DESC) as risk_score
-        FROM customer_rfm
+            cr.customer_id,
+            cr.recency,
+            cr.frequency,
+            cr.monetary,
+            cr.avg_risk_score,
+            r.r_score,
+            f.f_score,
+            m.m_score,
+            k.risk_score
+        FROM customer_rfm cr
+        JOIN r_scores r ON cr.customer_id = r.customer_id
+        JOIN f_scores f ON cr.customer_id = f.customer_id
+        JOIN m_scores m ON cr.customer_id = m.customer_id
+        JOIN risk_scores k ON cr.customer_id = k.customer_id
     )
     SELECT 
         r_score || f_score || m_score as rfm_cell,
@@ -240,10 +439,10 @@ def customer_rfm_analysis_sqlite():
             ELSE 'Others'
         END as segment,
         COUNT(*) as customer_count,
-        ROUND(AVG(recency), 2) as avg_recency,
-        ROUND(AVG(frequency), 2) as avg_frequency,
-        ROUND(AVG(monetary), 2) as avg_monetary,
-        ROUND(AVG(avg_risk_score), 2) as avg_risk_score
+        AVG(recency) as avg_recency,
+        AVG(frequency) as avg_frequency,
+        AVG(monetary) as avg_monetary,
+        AVG(avg_risk_score) as avg_risk_score
     FROM rfm_scores
     GROUP BY r_score, f_score, m_score
     ORDER BY r_score DESC, f_score DESC, m_score DESC;
@@ -256,39 +455,36 @@ def customer_rfm_analysis_sqlite():
 def portfolio_summary_simple():
     """Simple portfolio summary query"""
     query = """
-    SELECT 
-        'Total Loans' as metric, 
-        COUNT(*) as value 
-    FROM loans
+    WITH loan_totals AS (
+        -- One pass over loans for every loan metric
+        SELECT 
+            COUNT(*) as total_loans,
+            SUM(loan_amount) as total_exposure,
+            SUM(CASE WHEN current_status = 'ACTIVE' THEN 1 ELSE 0 END) as active_loans,
+            SUM(CASE WHEN current_status IN ('DELINQUENT', 'DEFAULT') THEN 1 ELSE 0 END) as delinquent_loans,
+            AVG(interest_rate) as avg_interest_rate,
+            SUM(emi_amount * tenure_months) as expected_collections
+        FROM loans
+    ),
+    collections AS (
+        SELECT SUM(amount) as collected
+        FROM transactions
+        WHERE status = 'SUCCESS'
+    )
+    SELECT 'Total Loans' as metric, total_loans as value FROM loan_totals
     UNION ALL
-    SELECT 
-        'Total Exposure', 
-        ROUND(SUM(loan_amount), 2)
-    FROM loans
+    SELECT 'Total Exposure', total_exposure FROM loan_totals
     UNION ALL
-    SELECT 
-        'Active Loans', 
-        SUM(CASE WHEN current_status = 'ACTIVE' THEN 1 ELSE 0 END)
-    FROM loans
+    SELECT 'Active Loans', active_loans FROM loan_totals
     UNION ALL
-    SELECT 
-        'Delinquent Loans', 
-        SUM(CASE WHEN current_status IN ('DELINQUENT', 'DEFAULT') THEN 1 ELSE 0 END)
-    FROM loans
+    SELECT 'Delinquent Loans', delinquent_loans FROM loan_totals
     UNION ALL
-    SELECT 
-        'Avg Interest Rate', 
-        ROUND(AVG(interest_rate), 2)
-    FROM loans
+    SELECT 'Avg Interest Rate', avg_interest_rate FROM loan_totals
     UNION ALL
     SELECT 
         'Collection Rate', 
-        ROUND(
-            (SELECT SUM(amount) FROM transactions WHERE status = 'SUCCESS') * 100.0 / 
-            (SELECT SUM(emi_amount * tenure_months) FROM loans), 
-            2
-        )
-    FROM loans LIMIT 1;
+        collected * 100.0 / expected_collections
+    FROM loan_totals CROSS JOIN collections;
     """
     
     return query
@@ -299,13 +495,10 @@ def loan_type_analysis_simple():
     SELECT 
         loan_type,
         COUNT(*) as loan_count,
-        ROUND(SUM(loan_amount), 2) as total_amount,
-        ROUND(AVG(interest_rate), 2) as avg_interest_rate,
-        ROUND(
-            SUM(CASE WHEN current_status = 'ACTIVE' THEN loan_amount ELSE 0 END) * 100.0 / 
-            SUM(loan_amount), 
-            2
-        ) as active_percentage
+        SUM(loan_amount) as total_amount,
+        AVG(interest_rate) as avg_interest_rate,
+        SUM(CASE WHEN current_status = 'ACTIVE' THEN loan_amount ELSE 0 END) * 100.0 / 
+        SUM(loan_amount) as active_percentage
     FROM loans
     GROUP BY loan_type
     ORDER BY total_amount DESC;
@@ -319,9 +512,9 @@ def customer_segmentation_simple():
     SELECT 
         customer_segment,
         COUNT(*) as customer_count,
-        ROUND(AVG(credit_score), 2) as avg_credit_score,
-        ROUND(AVG(annual_income), 2) as avg_income,
-        ROUND(AVG(age), 2) as avg_age
+        AVG(credit_score) as avg_credit_score,
+        AVG(annual_income) as avg_income,
+        AVG(age) as avg_age
     FROM customers
     WHERE customer_segment IS NOT NULL
     GROUP BY customer_segment
@@ -338,17 +531,11 @@ def payment_mode_analysis_simple():
         COUNT(*) as transaction_count,
         SUM(CASE WHEN status = 'SUCCESS' THEN 1 ELSE 0 END) as successful_count,
         SUM(CASE WHEN bounce_flag = 1 THEN 1 ELSE 0 END) as bounced_count,
-        ROUND(SUM(amount), 2) as total_amount,
-        ROUND(
-            SUM(CASE WHEN status = 'SUCCESS' THEN 1 ELSE 0 END) * 100.0 / 
-            COUNT(*), 
-            2
-        ) as success_rate,
-        ROUND(
-            SUM(CASE WHEN bounce_flag = 1 THEN 1 ELSE 0 END) * 100.0 / 
-            COUNT(*), 
-            2
-        ) as bounce_rate
+        SUM(amount) as total_amount,
+        SUM(CASE WHEN status = 'SUCCESS' THEN 1 ELSE 0 END) * 100.0 / 
+        COUNT(*) as success_rate,
+        SUM(CASE WHEN bounce_flag = 1 THEN 1 ELSE 0 END) * 100.0 / 
+        COUNT(*) as bounce_rate
     FROM transactions
     GROUP BY payment_mode
     ORDER BY total_amount DESC;
@@ -362,14 +549,11 @@ def risk_distribution_simple():
     SELECT 
         rf.risk_grade,
         COUNT(*) as loan_count,
-        ROUND(AVG(rf.combined_risk_score), 2) as avg_risk_score,
-        ROUND(SUM(l.loan_amount), 2) as total_exposure,
-        ROUND(AVG(l.interest_rate), 2) as avg_interest_rate,
-        ROUND(
-            SUM(CASE WHEN l.current_status IN ('DELINQUENT', 'DEFAULT') THEN 1 ELSE 0 END) * 100.0 / 
-            COUNT(*), 
-            2
-        ) as default_rate
+        AVG(rf.combined_risk_score) as avg_risk_score,
+        SUM(l.loan_amount) as total_exposure,
+        AVG(l.interest_rate) as avg_interest_rate,
+        SUM(CASE WHEN l.current_status IN ('DELINQUENT', 'DEFAULT') THEN 1 ELSE 0 END) * 100.0 / 
+        COUNT(*) as default_rate
     FROM risk_features rf
     JOIN loans l ON rf.loan_id = l.loan_id
     WHERE rf.risk_grade IS NOT NULL
@@ -381,19 +565,213 @@ def risk_distribution_simple():
 
 # ==================== EXECUTION FUNCTIONS ====================
 
-def execute_query(query, db_path='database/fintech_portfolio.db'):
+def julian_day_today():
+    """Julian day of today's midnight, bound as $today instead of JULIANDAY('now') per row"""
+    return date.today().toordinal() + 1721424.5
+
+def fetch_table(conn, query, params=()):
+    """
+    Run a query through the connection's statement cache and return an
+    Arrow table built straight from the cursor
+    """
+    cursor = conn.execute(query, params)
+    columns = [d[0] for d in cursor.description]
+    rows = cursor.fetchall()
+    
+    if rows:
+        arrays = [pa.array(values) for values in zip(*rows)]
+    else:
+        arrays = [pa.array([]) for _ in columns]
+    
+    return pa.Table.from_arrays(arrays, names=columns)
+
+def fetch_frame(conn, query, params=()):
+    """Run a query and return an Arrow-backed DataFrame"""
+    return fetch_table(conn, query, params).to_pandas(types_mapper=pd.ArrowDtype)
+
+# Columns each query used to wrap in ROUND(..., 2), keyed by query text;
+# everything else is returned unrounded, as before
+ROUNDED_COLUMNS = {
+    cohort_analysis_sqlite(): ('retention_rate',),
+    risk_adjusted_return_sqlite(): ('raroc_percentage',),
+    payment_behavior_analysis_sqlite(): ('cumulative_bounce_rate',),
+    early_warning_system_sqlite(): ('avg_risk_score', 'avg_bounce_rate'),
+    customer_rfm_analysis_sqlite(): ('avg_recency', 'avg_frequency', 'avg_monetary', 'avg_risk_score'),
+    portfolio_summary_simple(): ('value',),
+    loan_type_analysis_simple(): ('total_amount', 'avg_interest_rate', 'active_percentage'),
+    customer_segmentation_simple(): ('avg_credit_score', 'avg_income', 'avg_age'),
+    payment_mode_analysis_simple(): ('total_amount', 'success_rate', 'bounce_rate'),
+    risk_distribution_simple(): ('avg_risk_score', 'total_exposure', 'avg_interest_rate', 'default_rate')
+}
+
+def round_half_up(value, ndigits=2):
+    """Round on the shortest decimal form, half away from zero, as SQLite's ROUND does"""
+    if value is None or not math.isfinite(value):
+        return value
+    return float(Decimal(str(value)).quantize(Decimal(1).scaleb(-ndigits), rounding=ROUND_HALF_UP))
+
+def round_table(table, columns, ndigits=2):
+    """Round the named fractional columns for presentation; integer columns are left as is"""
+    for i, field in enumerate(table.schema):
+        if field.name in columns and (pa.types.is_floating(field.type) or pa.types.is_decimal(field.type)):
+            values = [round_half_up(value, ndigits) for value in table.column(i).to_pylist()]
+            table = table.set_column(i, pa.field(field.name, pa.float64()), pa.array(values, pa.float64()))
+    return table
+
+def execute_query(query, conn=None, params=()):
     """Execute SQL query and return results as DataFrame"""
     try:
-        conn = sqlite3.connect(db_path)
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        return df
+        if conn is None:
+            conn = get_connection()
+        table = round_table(fetch_table(conn, query, params), ROUNDED_COLUMNS.get(query, ()))
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
     except Exception as e:
         print(f"Query execution error: {e}")
         return pd.DataFrame()
 
-def run_all_analytics():
-    """Run all analytics queries and save results"""
+def execute_query_duckdb(query, con, params=()):
+    """Execute SQL query on DuckDB and return results as DataFrame"""
+    try:
+        table = round_table(con.execute(query, params).fetch_arrow_table(), ROUNDED_COLUMNS.get(query, ()))
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+    except Exception as e:
+        print(f"Query execution error: {e}")
+        return pd.DataFrame()
+
+def save_parquet(df, name):
+    """Write a result to analytics/<name>.parquet (zstd, dictionary-encoded columns)"""
+    os.makedirs(ANALYTICS_DIR, exist_ok=True)
+    pq.write_table(
+        pa.Table.from_pandas(df, preserve_index=False),
+        os.path.join(ANALYTICS_DIR, f'{name}.parquet'),
+        compression='zstd',
+        use_dictionary=True
+    )
+
+# ==================== RESULT CACHE ====================
+
+def ensure_cache_table(conn):
+    """Create the table tracking cached analytics results"""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS cache.meta_cache (
+        query_hash TEXT PRIMARY KEY,
+        cache_table TEXT,
+        src_signature TEXT,
+        updated_at TEXT
+    )
+    """)
+    conn.commit()
+
+def query_hash(query):
+    """Cache key for a query's SQL text"""
+    return hashlib.sha1(query.encode()).hexdigest()[:16]
+
+def prune_cache(conn, queries):
+    """Drop cached results of queries that are no longer run (e.g. after a SQL change)"""
+    keep = {query_hash(query) for query in queries}
+    stale = [
+        (key, cache_table) for key, cache_table in
+        conn.execute("SELECT query_hash, cache_table FROM cache.meta_cache")
+        if key not in keep
+    ]
+    
+    for key, cache_table in stale:
+        conn.execute(f"DROP TABLE IF EXISTS cache.{cache_table}")
+        conn.execute("DELETE FROM cache.meta_cache WHERE query_hash = ?", (key,))
+    conn.commit()
+
+def file_state(path):
+    """(size, mtime) of a file, or None if it is missing or empty"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns) if stat.st_size else None
+
+def source_signature(conn):
+    """
+    Dirty bit for cached results: MAX(rowid) of every source table, the size and
+    mtime of the main file and its WAL, plus today's date.
+    Appends move MAX(rowid); any write, including an in-place UPDATE, touches the
+    WAL (or the main file once checkpointed). An empty WAL is ignored, since each
+    new process recreates it without changing any data.
+    """
+    tables = [
+        name for (name,) in conn.execute(
+            "SELECT name FROM main.sqlite_master WHERE type='table' "
+            "AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        )
+    ]
+    query = " UNION ALL ".join(
+        [f"SELECT '{table}', MAX(rowid) FROM main.\"{table}\"" for table in tables] +
+        ["SELECT 'date', date('now')"]
+    )
+    
+    main_file = next(path for _, name, path in conn.execute("PRAGMA database_list") if name == 'main')
+    files = [file_state(main_file), file_state(main_file + '-wal')] if main_file else []
+    
+    return json.dumps([conn.execute(query).fetchall(), files])
+
+def write_cache_table(conn, cache_table, df):
+    """Replace cache.<cache_table> with the rows of df"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    columns = ', '.join(f'"{name}"' for name in table.column_names)
+    placeholders = ', '.join('?' * table.num_columns)
+    
+    conn.execute(f"DROP TABLE IF EXISTS cache.{cache_table}")
+    conn.execute(f"CREATE TABLE cache.{cache_table} ({columns})")
+    conn.executemany(
+        f"INSERT INTO cache.{cache_table} VALUES ({placeholders})",
+        zip(*(column.to_pylist() for column in table.columns))
+    )
+
+def cached_query(func):
+    """Serve a query from its cache.analytics_cache_<hash> table while its sources are unchanged"""
+    @functools.wraps(func)
+    def wrapper(query, conn=None, params=()):
+        if conn is None:
+            conn = get_connection()
+        
+        # One table per query; bound parameters (e.g. $today) only invalidate it
+        key = query_hash(query)
+        cache_table = f"analytics_cache_{key}"
+        
+        try:
+            signature = source_signature(conn) + json.dumps(params, sort_keys=True)
+            row = conn.execute(
+                "SELECT src_signature FROM cache.meta_cache WHERE query_hash = ?", (key,)
+            ).fetchone()
+            if row and row[0] == signature:
+                return fetch_frame(conn, f"SELECT * FROM cache.{cache_table}")
+        except sqlite3.Error:
+            signature = None
+        
+        df = func(query, conn, params)
+        
+        if signature is not None and not df.empty:
+            try:
+                conn.execute("BEGIN")
+                write_cache_table(conn, cache_table, df)
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache.meta_cache VALUES (?, ?, ?, datetime('now'))",
+                    (key, cache_table, signature)
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                conn.rollback()
+                print(f"Result cache update failed: {e}")
+        
+        return df
+    
+    return wrapper
+
+cached_execute_query = cached_query(execute_query)
+
+def run_all_analytics(db_path=DB_PATH, engine='sqlite'):
+    """
+    Run all analytics queries and save results.
+    engine='duckdb' runs the same SQL on DuckDB's vectorized engine over the SQLite file.
+    """
     queries = {
         'portfolio_summary': portfolio_summary_simple(),
         'loan_type_analysis': loan_type_analysis_simple(),
@@ -404,26 +782,56 @@ def run_all_analytics():
         'risk_adjusted_return': risk_adjusted_return_sqlite(),
         'rfm_analysis': customer_rfm_analysis_sqlite()
     }
+    query_params = {
+        'rfm_analysis': {'today': julian_day_today()}
+    }
     
     results = {}
     
+    if engine == 'duckdb':
+        run = lambda q, params: execute_query_duckdb(q, get_duckdb_connection(db_path), params)
+    else:
+        ensure_indexes(db_path)
+        ensure_cache_table(get_connection(db_path))
+        prune_cache(get_connection(db_path), queries.values())
+        run = lambda q, params: cached_execute_query(q, get_connection(db_path), params)
+    
     print("Running Analytics Queries...")
     print("=" * 60)
     
-    for name, query in queries.items():
+    # WAL allows concurrent readers and sqlite3 releases the GIL while a query
+    # runs, so each worker thread executes on its own connection
+    executor = get_executor()
+    futures = {
+        executor.submit(run, query, query_params.get(name, ())): name
+        for name, query in queries.items()
+    }
+    writes = {}
+    
+    for future in as_completed(futures):
+        name = futures[future]
         try:
-            df = execute_query(query)
+            df = future.result()
             if not df.empty:
                 results[name] = df
                 print(f"✓ {name}: {len(df)} rows")
                 
-                # Save to CSV
-                df.to_csv(f'analytics_{name}.csv', index=False)
+                # Save to Parquet on the pool while remaining queries run
+                writes[executor.submit(save_parquet, df, name)] = name
             else:
                 print(f"✗ {name}: No results")
         except Exception as e:
             print(f"✗ {name} failed: {e}")
     
+    for future in as_completed(writes):
+        try:
+            future.result()
+        except Exception as e:
+            print(f"✗ {writes[future]} Parquet export failed: {e}")
+    
+    # Keep results in query order
+    results = {name: results[name] for name in queries if name in results}
+    
     print("=" * 60)
     print(f"Completed: {len(results)} queries successful")
     
@@ -433,8 +841,8 @@ if __name__ == "__main__":
     print("FinTech Analytics - SQLite Version")
     print("=" * 60)
     
-    # Run all analytics
-    results = run_all_analytics()
+    # Run all analytics (pass --duckdb to use the DuckDB engine)
+    results = run_all_analytics(engine='duckdb' if '--duckdb' in sys.argv[1:] else 'sqlite')
     
     # Display sample results
     if results: